@@ -10,12 +10,22 @@ import collections
 import math
 import random
 import statistics
+import weakref
 
 from perlcompat import die, warn, getopts
 import graph_tools
 import numpy
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
 EPS = 1e-4
+# The number of uniform random numbers drawn at once per agent.  Large
+# enough to amortize the per-draw overhead, small enough not to overshoot
+# short trials.
+RAND_BUF_SIZE = 8192
 GRAPH_TYPES = 'random,ba,barandm,ring,tree,btree,lattice,voronoi,db,3-regular,4-regular,limaini'
 AGENT_TYPES = 'EmbedRW,SRW,SARW,HybridRW,BloomRW,kHistory_LRU,kHistory_FIFO,kHistory,VARW,NBRW,BiasedRW,EigenvecRW,ClosenessRW,BetweennessRW,EccentricityRW,LZRW,MaxDegreeRW,MERW,OBRW'
 
@@ -32,6 +42,31 @@ def mean_and_conf95(vals):
     VALS."""
     return statistics.mean(vals), conf95(vals)
 
+class RunningStats:
+    """Welford-style online accumulator for the mean and the 95% confidence
+    interval of measurements.  Unlike mean_and_conf95, reporting a running
+    average does not re-scan all samples recorded so far."""
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.
+        self._m2 = 0.  # Sum of squared deviations from the running mean.
+
+    def add(self, x):
+        """Record a new measurement X."""
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (x - self.mean)
+
+    def conf95(self):
+        """Return the 95% confidence interval of the measurements recorded
+        so far."""
+        zval = 1.960
+        if self.n <= 1:
+            return 0
+        stdev = math.sqrt(self._m2 / (self.n - 1))
+        return zval * stdev / math.sqrt(self.n)
+
 def _create_graph(type_, n=100, k=3.):
     """Randomly generate a graph instance using network generation model TYPE_.
     If possible, a graph with N vertices and the average degree of K is
@@ -77,20 +112,80 @@ def create_graph(type_, *kargs, **kwargs):
     h.set_graph_attribute('name', type_)
     return h
 
+@lru_cache
+def agent_class(type_):
+    """Resolve an agent class from its name.  The result is cached so that
+    repeated lookups (e.g., one per trial) do not re-evaluate the name."""
+    return eval(type_)
+
 def create_agent(type_, *args, **kwargs):
     # Create an agent of a given agent class.
-    cls = eval(type_)
+    cls = agent_class(type_)
     return cls(*args, **kwargs)
 
+class GraphView:
+    """Read-only view of graph G: a CSR-style neighbor representation
+    (the neighbors of vertex U are stored contiguously in
+    FLAT[OFFSETS[U]:OFFSETS[U + 1]]), a degree table, and per-vertex
+    neighbor sets for O(1) adjacency tests.  The view does not track graph
+    mutations by itself; call graph_view_invalidate after mutating the
+    graph."""
+    def __init__(self, g):
+        self.version = 0  # Incremented on every rebuild.
+        self.refresh(g)
+
+    def refresh(self, g):
+        """Rebuild the view from the current topology of graph G."""
+        n = g.nvertices()
+        # NOTE: This code assumes vertices are numbered from 1 to N.
+        offsets = numpy.zeros(n + 2, dtype=int)
+        flat = []
+        adj_set = [frozenset()]  # Unused slot; vertex IDs start at 1.
+        for u in range(1, n + 1):
+            # Neighbors are sorted to allow binary search within a slice.
+            nbrs = sorted(g.neighbors(u))
+            flat.extend(nbrs)
+            offsets[u + 1] = len(flat)
+            adj_set.append(frozenset(nbrs))
+        self.offsets = offsets
+        self.flat = numpy.array(flat, dtype=int)
+        self.degrees = numpy.diff(offsets)
+        self.adj_set = adj_set
+        self.version += 1
+
+_graph_views = weakref.WeakKeyDictionary()
+
+def graph_view(g):
+    """Return the GraphView for graph G, building it on first use.  The view
+    is cached per graph so that all agents (e.g., successive trials in a
+    simulation) share the same arrays."""
+    try:
+        return _graph_views[g]
+    except KeyError:
+        view = _graph_views[g] = GraphView(g)
+        return view
+
+def graph_view_invalidate(g):
+    """Notify that graph G has been mutated (e.g., an edge rewire):
+    rebuild the cached view so that agents walking on G observe the new
+    topology from their next step on."""
+    view = _graph_views.get(g)
+    if view is not None:
+        view.refresh(g)
+
+def random_with_weights(choices, weights):
+    """Randomly choose one of CHOICES with the probability proportional to
+    its weight in the numpy array WEIGHTS."""
+    cumul = weights.cumsum()
+    return choices[cumul.searchsorted(random.random() * cumul[-1])]
+
 def random_with_distrib(distrib):
-    total = sum(distrib.values())
-    chosen = random.uniform(0, total)
-    cumul = 0
-    for key, weight in distrib.items():
-        if cumul <= chosen < cumul + weight:
-            return key
-        cumul += weight
-    return key
+    """Randomly choose one of the keys of DISTRIB with the probability
+    proportional to its value.  Legacy dict interface; hot paths should
+    pass arrays to random_with_weights directly."""
+    keys = list(distrib)
+    weights = numpy.fromiter(distrib.values(), dtype=float, count=len(keys))
+    return random_with_weights(keys, weights)
 
 # ----------------------------------------------------------------
 # NOTE: The follwing code is essentially based on
@@ -99,31 +194,74 @@ class BloomFilter:
     """Bloom filter of size SIZE with three types of hash functions."""
     def __init__(self, size):
         if size is None:
-            size = 1000
             size = 32 * 3
         self.size = size  # Size of the Bloom filter in bits.
-        self.bitarray = [0] * self.size
-
-    def hashes(self, key):
-        """Return three independent hashes in [0 : self.size] for KEY."""
-        digest = hash(str(key))
+        # Bits are packed into 64-bit words for bit-parallel tests.
+        self.words = numpy.zeros((size + 63) // 64, dtype=numpy.uint64)
+
+    @staticmethod
+    def size_for(n_items, p=.001):
+        """Return the filter size in bits required to store N_ITEMS keys
+        with a false positive probability of roughly P."""
+        return max(256, int(1.44 * n_items * math.log2(1 / p)))
+
+    def hashes(self, keys):
+        """Return three independent hashes in [0 : self.size] for each of
+        KEYS, a numpy array of integer keys."""
+        # Mix the integer keys with independent splitmix64 multipliers; one
+        # 64-bit multiply per hash, no per-key string allocation.
+        digest = keys.astype(numpy.uint64) * numpy.uint64(0x9E3779B97F4A7C15)
         hash1 = digest % self.size
-        hash2 = (digest // self.size) % self.size
-        hash3 = (digest // self.size // self.size) % self.size
+        hash2 = (digest * numpy.uint64(0xBF58476D1CE4E5B9)) % self.size
+        hash3 = (digest * numpy.uint64(0x94D049BB133111EB)) % self.size
         return hash1, hash2, hash3
 
     def add(self, key):
         """Register KEY to the Bloom filter."""
-        for n in self.hashes(key):
-            self.bitarray[n] = 1
+        for n in self.hashes(numpy.asarray([key])):
+            self.words[n // 64] |= numpy.uint64(1) << (n % 64)
 
-    def query(self, key):
-        """Check if KEY already exists in the Bloom filter.  Note that the
+    def query_many(self, keys):
+        """Check which of KEYS (a numpy array of integer keys) already exist
+        in the Bloom filter, returning a boolean numpy array.  Note that the
         Bloom filter may result in false positive but not in false
         negative."""
-        return all(self.bitarray[n] == 1 for n in self.hashes(key))
+        exist = numpy.ones(len(keys), dtype=bool)
+        for n in self.hashes(numpy.asarray(keys)):
+            exist &= (self.words[n // 64] >> (n % 64)) & 1 != 0
+        return exist
+
+    def query(self, key):
+        """Check if KEY already exists in the Bloom filter."""
+        return bool(self.query_many(numpy.asarray([key]))[0])
+
+    def bits(self):
+        """Return the filter contents unpacked as an array of single bits,
+        mainly for visualization."""
+        return numpy.unpackbits(self.words.view(numpy.uint8),
+                                bitorder='little')[:self.size]
 
 # ----------------------------------------------------------------
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def _srw_cover_kernel(offsets, flat, nvisits, hitting, current, step,
+                          ncovered, n_nodes, max_steps, seed):
+        """Compiled inner loop of a plain SRW trial: pick a random neighbor
+        on the CSR arrays and update the visit counters, entirely at C-loop
+        speed.  NVISITS and HITTING are updated in place."""
+        numpy.random.seed(seed)
+        while ncovered < n_nodes and step <= max_steps:
+            lo = offsets[current]
+            deg = offsets[current + 1] - lo
+            current = flat[lo + numpy.random.randint(deg)]
+            if nvisits[current] == 0:
+                hitting[current] = step
+                ncovered += 1
+            nvisits[current] += 1
+            step += 1
+        return current, step, ncovered
+
 class SRW:
     """Simple Random Walk (SRW) agent."""
     def __init__(self,
@@ -133,13 +271,33 @@ class SRW:
                  *kargs,
                  **kwargs):
         self.graph = graph
-        self.path = []  # List of visited vertiecs.
+        if graph is not None:
+            # All degree/neighbor/adjacency lookups go through the shared
+            # view instead of re-walking graph_tools structures.  The view
+            # is rebuilt by graph_view_invalidate when the graph is
+            # mutated, so never snapshot its arrays across steps.
+            self._view = graph_view(graph)
+            self._table_version = self._view.version
+        # Only the last two visited vertices are kept; recording the full
+        # path would grow without bound while only prev_vertex() reads it.
+        self._prev = None
+        self._prev2 = None
         self.step = 0  # Global clock.
-        self.nvisits = collections.defaultdict(
-            int)  # Records the number of vists.
+        # Uniform random numbers are drawn in batches from a PCG64
+        # generator, which is both faster per draw and cheaper than one
+        # random-module call per step.  The generator is seeded from the
+        # main random stream to keep runs reproducible.
+        self._rng = numpy.random.default_rng(random.getrandbits(64))
+        self._rand_buf = numpy.empty(0)
+        self._rand_idx = 0
+        # Vertex IDs are small contiguous integers, so plain arrays beat
+        # per-access dict hashing and allow vectorized masking.
+        n = graph.nvertices() if graph is not None else 0
+        # Records the number of vists.
+        self.nvisits = numpy.zeros(n + 1, dtype=numpy.int32)
+        # Records the first visiting time.
+        self.hitting = numpy.zeros(n + 1, dtype=numpy.int32)
         self.ncovered = 0  # The number of uniquely visisted vertices.
-        self.hitting = collections.defaultdict(
-            int)  # Records the first visiting time.
         self.current = None
         if current:
             self.move_to(current)
@@ -156,22 +314,57 @@ class SRW:
         # Every neighbor is chosen with the same probability.
         return 1
 
+    def randf(self):
+        """Return a uniform random float in [0, 1) from the pre-drawn
+        batch, refilling the batch when it is exhausted."""
+        i = self._rand_idx
+        if i >= len(self._rand_buf):
+            self._rand_buf = self._rng.random(RAND_BUF_SIZE)
+            i = 0
+        self._rand_idx = i + 1
+        return self._rand_buf[i]
+
+    def neighbors(self, u):
+        """Return the neighbors of vertex U as a slice of the shared CSR
+        array."""
+        view = self._view
+        return view.flat[view.offsets[u]:view.offsets[u + 1]]
+
+    def _rebuild_tables(self):
+        """Recompute the per-vertex tables derived from the graph topology
+        after the graph has been mutated.  The base agent derives none;
+        subclasses extend this."""
+        self._table_version = self._view.version
+
+    def weights(self, u, nbrs):
+        """Return transistion weights from vertex U to every vertex in NBRS
+        as a numpy array.  None indicates that all neighbors are equally
+        likely."""
+        # Every neighbor is chosen with the same probability.
+        return None
+
     def pick_next(self, u=None):
         """Randomly choose one of neighbors of vetex U with the probabiity
         proportional to its weight."""
         if u is None:
             u = self.current
-        neighbors = self.graph.neighbors(u)
+        neighbors = self.neighbors(u)
         # Vertex U must not be isolated.
-        assert neighbors
-        # Save all weights for transistion from vertex U.
-        weights = {v: self.weight(u, v) for v in neighbors}
-        return random_with_distrib(weights)
+        assert len(neighbors)
+        weights = self.weights(u, neighbors)
+        if weights is None:
+            # Uniform sampling collapses to a single random draw.
+            return neighbors[int(self.randf() * len(neighbors))]
+        # Weighted sampling with a single C-level binary search.
+        cumul = weights.cumsum()
+        chosen = cumul.searchsorted(self.randf() * cumul[-1])
+        return neighbors[chosen]
 
     def move_to(self, v):
         """Move the random walker to vertex V."""
+        self._prev2 = self._prev
+        self._prev = self.current
         self.current = v
-        self.path.append(v)
         if not self.nvisits[v]:  # is this the first time?
             self.hitting[v] = self.step
             self.ncovered += 1
@@ -179,29 +372,100 @@ class SRW:
 
     def advance(self):
         """Advance the random walker one step forward."""
+        if self._table_version != self._view.version:
+            self._rebuild_tables()
         v = self.pick_next()
         self.move_to(v)
         self.step += 1
 
+    def run(self, max_steps=math.inf):
+        """Advance the random walker until every vertex has been visited or
+        the global clock exceeds MAX_STEPS.  A plain SRW (not a subclass)
+        with a finite step budget runs the whole trial in a compiled kernel
+        when numba is available."""
+        n_nodes = self.graph.nvertices()
+        if numba is not None and type(self) is SRW and max_steps is not math.inf:
+            current, step, ncovered = _srw_cover_kernel(
+                self._view.offsets, self._view.flat, self.nvisits,
+                self.hitting, self.current, self.step, self.ncovered,
+                n_nodes, max_steps, random.getrandbits(32))
+            self.current = int(current)
+            self.step = int(step)
+            self.ncovered = int(ncovered)
+            return
+        while self.ncovered < n_nodes and self.step <= max_steps:
+            self.advance()
+
     def prev_vertex(self, n=1):
-        try:
-            return self.path[-(n + 1)]
-        except IndexError:
-            return None
+        """Return the vertex visited N steps before the current one."""
+        if n == 1:
+            return self._prev
+        if n == 2:
+            return self._prev2
+        raise ValueError('only the last two visited vertices are recorded')
 
     def dump(self):
         v = self.current
-        d = self.graph.degree(v)
+        d = self._view.degrees[v]
         print(f'{self.step}\tvisit\t{v}\t{self.nvisits[v]}\t{d}')
         print(
             f'{self.step}\tstatus\t{self.ncovered}\t{self.graph.nvertices()}')
 
+def srw_ensemble(g, nwalkers, start, max_steps=math.inf):
+    """Simulate NWALKERS independent plain SRW walkers on graph G starting
+    from vertex START, all advanced in lockstep with numpy operations over
+    the shared CSR arrays.  Each walker stops once it has covered the graph
+    or the step budget MAX_STEPS is exhausted.  Return the per-walker cover
+    times (MAX_STEPS + 1 for walkers that ran out of budget) and the
+    per-walker hitting-time and visit-count tables."""
+    view = graph_view(g)
+    offsets, flat = view.offsets, view.flat
+    n_nodes = g.nvertices()
+    rng = numpy.random.default_rng(random.getrandbits(64))
+    current = numpy.full(nwalkers, start, dtype=int)
+    steps = numpy.zeros(nwalkers, dtype=int)
+    ncovered = numpy.ones(nwalkers, dtype=int)
+    nvisits = numpy.zeros((nwalkers, n_nodes + 1), dtype=numpy.int32)
+    hitting = numpy.zeros((nwalkers, n_nodes + 1), dtype=numpy.int32)
+    nvisits[:, start] = 1
+    active = numpy.arange(nwalkers)
+    step = 0
+    while len(active) and step <= max_steps:
+        cur = current[active]
+        lo = offsets[cur]
+        deg = offsets[cur + 1] - lo
+        # One uniform neighbor pick per active walker.
+        nxt = flat[lo + rng.integers(0, deg)]
+        current[active] = nxt
+        first = nvisits[active, nxt] == 0
+        hitting[active[first], nxt[first]] = step
+        ncovered[active] += first
+        nvisits[active, nxt] += 1
+        step += 1
+        # Retire the walkers that have covered the whole graph.
+        done = ncovered[active] >= n_nodes
+        steps[active[done]] = step
+        active = active[~done]
+    # Walkers still active have exhausted the step budget.
+    steps[active] = step
+    return steps, hitting, nvisits
+
 # ----------------------------------------------------------------
 class BiasedRW(SRW):
     """Biased Random Walk (Biased-RW) agent."""
     def __init__(self, alpha=-.5, *kargs, **kwargs):
         self.alpha = alpha
         super().__init__(*kargs, **kwargs)
+        self._rebuild_tables()
+
+    def _rebuild_tables(self):
+        super()._rebuild_tables()
+        # Degrees and ALPHA are constant between graph mutations, so
+        # precompute d_v^alpha for all vertices instead of computing a
+        # power per neighbor at every step.
+        degrees = self._view.degrees.astype(float)
+        degrees[0] = 1  # Vertex IDs start at 1; keep the unused slot finite.
+        self._degpow = degrees**self.alpha
 
     def weight(self, u, v):
         """Biased RW randomlyh chooses one of its neighbor with the
@@ -210,48 +474,58 @@ class BiasedRW(SRW):
         if u is None:
             u = self.current
         w = super().weight(u, v)
-        dv = self.graph.degree(v)
-        return w * dv**self.alpha
+        return w * self._degpow[v]
+
+    def weights(self, u, nbrs):
+        # A pure table gather; fancy indexing returns a fresh array, so
+        # subclasses may overwrite entries in place.
+        return self._degpow[nbrs]
 
 class NBRW(BiasedRW):
     """Non-Backtracking Random Walk (NBRW) agent."""
-    def weight(self, u, v):
-        if u is None:
-            u = self.current
+    def weights(self, u, nbrs):
         # This code assumes that vertex U is the current vetex.
         assert u == self.current
-        if v == self.prev_vertex():
-            return EPS
-        else:
-            return super().weight(u, v)
+        w = super().weights(u, nbrs)
+        t = self.prev_vertex()
+        if t:
+            w[nbrs == t] = EPS
+        return w
 
 class SARW(BiasedRW):
     """Self-Avoiding Random Walk (SARW) agent."""
-    def weight(self, u, v):
+    def weights(self, u, nbrs):
         """SARW is equivalent to SRW except that the agent tries to avoid to
         re-visit vertices that the agent has already visited."""
-        if u is None:
-            u = self.current
-        if self.nvisits[v]:
-            return EPS
-        else:
-            return super().weight(u, v)
+        w = super().weights(u, nbrs)
+        w[self.nvisits[nbrs] > 0] = EPS
+        return w
 
 class BloomRW(BiasedRW):
     """Random Walk with Bloom filter (Bloom-RW) agent."""
     def __init__(self, bf_size=None, *kargs, **kwargs):
+        if bf_size is None:
+            graph = kwargs.get('graph')
+            if graph is not None:
+                # A covering walk inserts every vertex, so size the filter
+                # for the whole graph; the hard-coded default saturates on
+                # all but tiny graphs and degenerates BloomRW into SARW.
+                bf_size = BloomFilter.size_for(graph.nvertices())
         self.bf = BloomFilter(size=bf_size)
         super().__init__(*kargs, **kwargs)
 
-    def weight(self, u, v):
-        if u is None:
-            u = self.current
-        if self.bf.query(v):
-            if v not in self.path:
-                warn(f'** false positive {v}')
-            return EPS
-        else:
-            return super().weight(u, v)
+    def bf_mask(self, nbrs):
+        """Return a boolean mask of the vertices in NBRS that the Bloom
+        filter reports as already visited."""
+        return self.bf.query_many(nbrs)
+
+    def weights(self, u, nbrs):
+        w = super().weights(u, nbrs)
+        seen = self.bf_mask(nbrs)
+        for v in nbrs[seen & (self.nvisits[nbrs] == 0)]:
+            warn(f'** false positive {v}')
+        w[seen] = EPS
+        return w
 
     def move_to(self, v):
         super().move_to(v)
@@ -259,20 +533,16 @@ class BloomRW(BiasedRW):
 
 class VARW(NBRW):
     """Random Walk with Vicinity Avoidance (VARW) agent."""
-    def weight(self, u, v):
+    def weights(self, u, nbrs):
         """VARW tries to avoid vicinity (i.e., neighbor vertices of the
         previously-visited vertices)."""
-        if u is None:
-            u = self.current
-        # This code assumes that vertex U is the current vetex.
-        assert u == self.current
+        w = super().weights(u, nbrs)
         # NOTE: the original VA-RW avoids neighbors of the last K vertices, rather
         # than those of the previous one.
         t = self.prev_vertex()
-        if t and self.graph.has_edge(t, v):
-            return EPS
-        else:
-            return super().weight(u, v)
+        if t:
+            w[numpy.isin(nbrs, self.neighbors(t))] = EPS
+        return w
 
 # ----------------------------------------------------------------
 class LZRW(BiasedRW):
@@ -285,74 +555,93 @@ class LZRW(BiasedRW):
         """LZRW probabilistically stays at the current vertex."""
         if u is None:
             u = self.current
-        if random.random() <= self.laziness:
+        if self.randf() <= self.laziness:
             return u
         else:
             return super().pick_next(u)
 
 class MaxDegreeRW(LZRW):
     """Max-Degree Random Walk (MaxDegreeRW) agent."""
-    def __init__(self, *kargs, **kwargs):
-        super().__init__(*kargs, **kwargs)
-        # FIXME: This code assumes that the graph is static.
-        self.max_degree = max(
-            [self.graph.degree(v) for v in self.graph.vertices()])
+    def _rebuild_tables(self):
+        super()._rebuild_tables()
+        degrees = self._view.degrees
+        self.max_degree = degrees[1:].max()
+        # Per-vertex laziness table; the stay probability of every vertex
+        # is fixed by its degree, so compute all of them at once.
+        self._laz = (self.max_degree - degrees) / self.max_degree
 
     def pick_next(self, u=None):
         # Stay at the current vertex with the probability of
         # (max_degree - degree)/degree.
-        degree = self.graph.degree(self.current)
-        self.laziness = (self.max_degree - degree) / self.max_degree
+        self.laziness = self._laz[self.current]
         return super().pick_next(u)
 
 class HybridRW(BloomRW):
     """Hybrid Random Walk (HybridRW) agent."""
-    def weight(self, u, v):
-        if u is None:
-            u = self.current
+    def weights(self, u, nbrs):
         # This code assumes that vertex U is the current vetex.
         assert u == self.current
-        # NBRW-like behavior.
-        if v == self.prev_vertex():
-            return EPS
-        # VARW-like behavior.
-        # NOTE: the original VA-RW avoids neighbors of the last K vertices, rather
-        # than those of the previous one.
+        # BiasedRW-like behavior.
+        w = self._degpow[nbrs]
         t = self.prev_vertex()
-        if t and self.graph.has_edge(t, v):
-            return EPS
+        if t:
+            # NBRW-like behavior.
+            w[nbrs == t] = EPS
+            # VARW-like behavior.
+            # NOTE: the original VA-RW avoids neighbors of the last K
+            # vertices, rather than those of the previous one.
+            w[numpy.isin(nbrs, self.neighbors(t))] = EPS
         # BloomRW-like behavior.
-        if self.bf.query(v):
-            return EPS
-        # BiasedRW-like behavior.
-        dv = self.graph.degree(v)
-        return dv**self.alpha
+        w[self.bf_mask(nbrs)] = EPS
+        return w
 
 class kHistory(BiasedRW):
     """k-History Random Walk (kHistoryRW) agent."""
     def __init__(self, hist_size=3, *kargs, **kwargs):
         self.hist_size = hist_size
         self.history = collections.deque(maxlen=hist_size)
+        # Per-vertex occurrence counts so that membership tests and the
+        # weight mask read a table instead of scanning the deque.
+        graph = kwargs.get('graph')
+        if graph is not None:
+            self.hist_count = numpy.zeros(graph.nvertices() + 1, dtype=int)
         super().__init__(*kargs, **kwargs)
 
-    def weight(self, u, v):
-        if v in self.history:
-            return EPS
-        else:
-            return super().weight(u, v)
+    def hist_append(self, v):
+        """Append vertex V to the history, keeping the occurrence counts in
+        sync with the deque."""
+        if len(self.history) == self.history.maxlen:
+            evicted = self.history[0]
+            if evicted is not None:
+                self.hist_count[evicted] -= 1
+        self.history.append(v)
+        if v is not None:
+            self.hist_count[v] += 1
+
+    def hist_remove(self, v):
+        """Remove vertex V from the history, keeping the occurrence counts
+        in sync with the deque."""
+        self.history.remove(v)
+        self.hist_count[v] -= 1
+
+    def weights(self, u, nbrs):
+        w = super().weights(u, nbrs)
+        w[self.hist_count[nbrs] > 0] = EPS
+        return w
 
     def move_to(self, v):
         # Always place the recent entry at the top.
         # NOTE: The history might have duplicates.
-        self.history.append(self.current)
+        self.hist_append(self.current)
         super().move_to(v)
 
 class kHistory_FIFO(kHistory):
     """k-History Random Walk with FIFO replacement (kHistoryRW-FIFO) agent."""
     def move_to(self, v):
-        if self.current not in self.history:
+        t = self.current
+        if t is None or not self.hist_count[t]:
             # The oldest entry is flushed automatically.
-            self.history.append(self.current)
+            self.hist_append(t)
         # FIXME: Avoid hard-coding.
         super(BiasedRW, self).move_to(v)
 
@@ -360,21 +649,45 @@ class kHistory_LRU(kHistory):
     """k-History Random Walk with LRU replacement (kHistoryRW-LRU) agent."""
     def move_to(self, v):
         # Always place the recent entry at the top.
-        if self.current in self.history:
-            self.history.remove(self.current)
-        self.history.append(self.current)
+        t = self.current
+        if t is not None and self.hist_count[t]:
+            self.hist_remove(t)
+        self.hist_append(t)
         # FIXME: Avoid hard-coding.
         super(BiasedRW, self).move_to(v)
 
 # ----------------------------------------------------------------
+# Centrality scores per graph and per centrality measure.  Centralities
+# depend only on the graph, so successive trials (agent instances) on the
+# same graph must not recompute them -- especially betweenness, which is
+# O(VE) per vertex.
+_centrality_caches = weakref.WeakKeyDictionary()
+
 class EigenvecRW(BiasedRW):
     """Eigenvector Random Walk (EigenvecRW) agent."""
     def __init__(self, *kargs, **kwargs):
         super().__init__(*kargs, **kwargs)
-        # Precompute centrality scores of all vertices.
-        self.centrality_cache = {}
-        for v in self.graph.vertices():
-            self.centrality_cache[v] = self.centrality(v)
+        # Precompute centrality scores of all vertices, shared across all
+        # agents of the same class walking on the same graph.
+        per_graph = _centrality_caches.setdefault(self.graph, {})
+        name = self.name()
+        if name not in per_graph:
+            per_graph[name] = {
+                v: self.centrality(v)
+                for v in self.graph.vertices()
+            }
+        self.centrality_cache = per_graph[name]
+        # Centralities and ALPHA are constant during a simulation, so
+        # precompute (c_v + EPS)^alpha for all vertices as well.
+        cent = numpy.zeros(self.graph.nvertices() + 1)
+        for v, c in self.centrality_cache.items():
+            cent[v] = c
+        self._centpow = (cent + EPS)**self.alpha
+        # Negative centrality scores (e.g., a sign-flipped eigenvector)
+        # raised to a fractional ALPHA yield NaN; fail loudly rather than
+        # sampling from a corrupt weight table.
+        assert not numpy.isnan(self._centpow[1:]).any(), \
+            f'{name}: negative centrality score encountered'
 
     def centrality(self, v):
         return self.graph.eigenvector_centrality(v)
@@ -382,8 +695,10 @@ class EigenvecRW(BiasedRW):
     def weight(self, u, v):
         if u is None:
             u = self.current
-        c = self.centrality_cache[v] + EPS
-        return c**self.alpha
+        return self._centpow[v]
+
+    def weights(self, u, nbrs):
+        return self._centpow[nbrs]
 
 class ClosenessRW(EigenvecRW):
     """Closeness Random Walk (ClosenessRW) agent."""
@@ -415,12 +730,19 @@ class MERW(SRW):
         # be the same.
         if self.eigvec1[0] < 0:
             self.eigvec1 = -self.eigvec1
+        # Precomputed weight vector: the 1 / (eigval1 * eigvec1[u - 1])
+        # factor is shared by every neighbor of vertex U and cancels under
+        # normalization, so the weight of vertex V is just eigvec1[v - 1].
+        self._wvec = numpy.asarray(self.eigvec1, dtype=float)
 
     def weight(self, u, v):
         if u is None:
             u = self.current
         return (1 / self.eigval1) * (self.eigvec1[v - 1] / self.eigvec1[u - 1])
 
+    def weights(self, u, nbrs):
+        return self._wvec[nbrs - 1]
+
 class EmbedRW(SRW):
     def __init__(self, *kargs, **kwargs):
         super().__init__(*kargs, **kwargs)
@@ -428,6 +750,7 @@ class EmbedRW(SRW):
         if self.target is None:
             self.target = self.graph.random_vertex()
         self.target_embed = self.embed_vector(self.target)
+        self._embed_mat = None
 
     @lru_cache
     def embed_vector(self, v):
@@ -435,24 +758,24 @@ class EmbedRW(SRW):
         norm = numpy.linalg.norm(vec)
         return vec / norm
 
-    @lru_cache
-    def _weight(self, u, v):
-        e_v = self.embed_vector(v)
-        # Only use the embedding vector of a neighbor node in seach mode.
-        norm1 = numpy.linalg.norm(self.target_embed - e_v, ord=1)
+    def embed_matrix(self):
+        """Return the embedding vectors of all vertices stacked as an (N, D)
+        matrix, built on first use."""
+        if self._embed_mat is None:
+            self._embed_mat = numpy.vstack([
+                self.embed_vector(v)
+                for v in range(1, self.graph.nvertices() + 1)
+            ])
+        return self._embed_mat
+
+    def weights(self, u, nbrs):
+        # Only use the embedding vectors of neighbor nodes in seach mode;
+        # one batched L1 distance replaces a norm call per neighbor.
+        norm1 = numpy.abs(self.embed_matrix()[nbrs - 1]
+                          - self.target_embed).sum(axis=1)
         # NOTE: the transistion probability must be high for a small norm.
-        return norm1
-
-    @lru_cache
-    def weight(self, u, v):
-        if u is None:
-            u = self.current
         # Normalize the weight among all neighbor nodes.
-        weights = [self._weight(u, _) for _ in self.graph.neighbors(u)]
-        total = EPS + sum(weights)
-        w = 1 - self._weight(u, v) / total
-        # print(f'{u}->{v}\t{w}')
-        return w
+        return 1 - norm1 / (EPS + norm1.sum())
 
 class SparseEmbedRW(EmbedRW):
     def __init__(self, embed_ratio=.1, *kargs, **kwargs):
@@ -481,6 +804,15 @@ class SparseEmbedRW(EmbedRW):
         norm1 = numpy.linalg.norm(self.target_embed - e_v, ord=1)
         return norm1
 
+    def weights(self, u, nbrs):
+        # Embedding vectors may be unavailable for a fraction of nodes, so
+        # the distances cannot be batched as in EmbedRW.
+        norm1 = numpy.fromiter((self._weight(u, v) for v in nbrs),
+                               dtype=float,
+                               count=len(nbrs))
+        # Normalize the weight among all neighbor nodes.
+        return 1 - norm1 / (EPS + norm1.sum())
+
     def advance(self):
         vec = self.embed_vector(self.current)
         if vec is not None:
@@ -500,10 +832,12 @@ class LevyRW(BiasedRW):
         proportional to its weight."""
         if u is None:
             u = self.current
-        neighbors = [v for v in self.graph.vertices() if v != u]
+        candidates = [v for v in self.graph.vertices() if v != u]
         # Save all weights for transistion from vertex U.
-        weights = {v: self.weight(u, v) for v in neighbors}
-        return random_with_distrib(weights)
+        weights = numpy.fromiter((self.weight(u, v) for v in candidates),
+                                 dtype=float,
+                                 count=len(candidates))
+        return random_with_weights(candidates, weights)
 
 class SprintRW(LevyRW):
     def __init__(self, *kargs, **kwargs):
@@ -517,7 +851,7 @@ class SprintRW(LevyRW):
             # Randomly pick 3 non-local nodes.
             non_neighbors = [
                 v for v in self.graph.vertices()
-                if not self.graph.has_edge(u, v) and u != v
+                if v not in self._view.adj_set[u] and u != v
             ]
             distant_nodes[u] = random.sample(non_neighbors, 3)
         return distant_nodes
@@ -529,14 +863,14 @@ class SprintRW(LevyRW):
         if self.next_distant_node:
             return self.next_hop_to(u, self.next_distant_node)
 
-        neighbors = self.graph.neighbors(u)
-        # Save all weights for transistion from vertex U.
-        # Pick the next destination from neighbors and distant nodes.
-        weights = {
-            v: self.weight(u, v)
-            for v in set(neighbors) | set(self.distant_nodes[u])
-        }
-        v = random_with_distrib(weights)
+        neighbors = self.neighbors(u)
+        # Pick the next destination from neighbors and distant nodes with
+        # the probability proportional to its weight.
+        candidates = list(set(neighbors) | set(self.distant_nodes[u]))
+        weights = numpy.fromiter((self.weight(u, v) for v in candidates),
+                                 dtype=float,
+                                 count=len(candidates))
+        v = random_with_weights(candidates, weights)
         if v in neighbors:
             # Normal random walk.
             return v